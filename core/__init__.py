@@ -1,15 +1,23 @@
+# Los submódulos se cargan de forma perezosa (PEP 562): importar `core` no arrastra
+# pandas, python-docx, lxml, jinja2, yaml ni docxcompose hasta que se usa un atributo.
+import importlib
+from typing import TYPE_CHECKING
 
-from .backend import (
-    guess_mapping, prepare_dataframe, parse_date, format_date_dmy, slugify,
-    list_candidate_tables, find_target_table, clear_table_keep_header, fill_table, month_name_es
-)
-from .routing import choose_template_for_group, load_routing_yaml, render_derived_placeholders
-from .funcionalidades import (
-    generate_letters_per_group, build_index_sheet, make_zip
-)
-from .pdf_utils import try_docx_to_pdf, merge_pdfs, add_text_watermark, sign_pdf_with_pfx
-from .merge import merge_documents_docx
-from .quality import compute_missing_summary, compute_duplicates_by_actor, compute_date_ranges_by_actor
+_LAZY_ATTRS = {
+    "guess_mapping": "backend", "prepare_dataframe": "backend", "parse_date": "backend",
+    "format_date_dmy": "backend", "slugify": "backend", "list_candidate_tables": "backend",
+    "find_target_table": "backend", "clear_table_keep_header": "backend", "fill_table": "backend",
+    "month_name_es": "backend",
+    "choose_template_for_group": "routing", "load_routing_yaml": "routing", "render_derived_placeholders": "routing",
+    "generate_letters_per_group": "funcionalidades", "build_index_sheet": "funcionalidades", "make_zip": "funcionalidades",
+    "try_docx_to_pdf": "pdf_utils", "merge_pdfs": "pdf_utils", "add_text_watermark": "pdf_utils",
+    "sign_pdf_with_pfx": "pdf_utils",
+    "run_postprocess_pipeline": "pipeline", "steps_for_rule": "pipeline",
+    "merge_documents_docx": "merge",
+    "render_letter_preview_html": "preview", "docx_to_html": "preview", "clear_preview_cache": "preview",
+    "compute_missing_summary": "quality", "compute_duplicates_by_actor": "quality",
+    "compute_date_ranges_by_actor": "quality",
+}
 
 __all__ = [
     "guess_mapping","prepare_dataframe","parse_date","format_date_dmy","slugify",
@@ -17,6 +25,36 @@ __all__ = [
     "choose_template_for_group","load_routing_yaml","render_derived_placeholders",
     "generate_letters_per_group","build_index_sheet","make_zip",
     "try_docx_to_pdf","merge_pdfs","add_text_watermark","sign_pdf_with_pfx",
+    "run_postprocess_pipeline","steps_for_rule",
     "merge_documents_docx",
+    "render_letter_preview_html","docx_to_html","clear_preview_cache",
     "compute_missing_summary","compute_duplicates_by_actor","compute_date_ranges_by_actor"
 ]
+
+_SUBMODULES = {"backend", "routing", "funcionalidades", "pdf_utils", "pipeline", "merge", "preview", "quality", "prewarm"}
+
+def __getattr__(name: str):
+    if name in _SUBMODULES:
+        return importlib.import_module(f".{name}", __name__)
+    mod_name = _LAZY_ATTRS.get(name)
+    if mod_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{mod_name}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+if TYPE_CHECKING:
+    from .backend import (
+        guess_mapping, prepare_dataframe, parse_date, format_date_dmy, slugify,
+        list_candidate_tables, find_target_table, clear_table_keep_header, fill_table, month_name_es
+    )
+    from .routing import choose_template_for_group, load_routing_yaml, render_derived_placeholders
+    from .funcionalidades import generate_letters_per_group, build_index_sheet, make_zip
+    from .pdf_utils import try_docx_to_pdf, merge_pdfs, add_text_watermark, sign_pdf_with_pfx
+    from .pipeline import run_postprocess_pipeline, steps_for_rule
+    from .merge import merge_documents_docx
+    from .preview import render_letter_preview_html, docx_to_html, clear_preview_cache
+    from .quality import compute_missing_summary, compute_duplicates_by_actor, compute_date_ranges_by_actor
@@ -89,6 +89,77 @@ def _add_field(run, field_code: str):
     fld.set(qn('w:instr'), field_code)
     run._r.append(fld)
 
+def _fecha_larga(city: str, letter_date: Optional[date]) -> str:
+    d = letter_date or pd.Timestamp.today().date()
+    return f"{city}, {d.day} de {month_name_es(d.month)} de {d.year}"
+
+def _build_group_letter(
+    grp_name: str,
+    gdf: pd.DataFrame,
+    default_template_bytes: bytes,
+    templates_map: Dict[str, bytes],
+    routing_cfg: Dict,
+    table_index_default: int | None,
+    fecha_larga: str,
+    naming_pattern: str,
+    image_assets: Dict[str, bytes] | None,
+    image_width_in: float,
+    template_choice: Tuple[Optional[bytes], Optional[int], Dict] | None = None,
+) -> Tuple[str, Document, Dict, int]:
+    """
+    Construye la carta de un solo grupo. Devuelve (nombre_archivo, documento, regla, registros).
+    `template_choice` permite reutilizar el resultado de choose_template_for_group ya calculado.
+    """
+    filas = _rows_from_group(gdf)
+    derived_cfg = (routing_cfg or {}).get("derived_placeholders", {})
+
+    # Regla y plantilla
+    tpl_bytes, table_idx, rule = template_choice or choose_template_for_group(grp_name, templates_map, routing_cfg)
+    tpl_bytes = tpl_bytes or default_template_bytes
+    table_idx = table_idx if table_idx is not None else table_index_default
+
+    # Placeholders base
+    actor = gdf["ACTOR"].dropna().astype(str).iloc[0] if "ACTOR" in gdf.columns and not gdf["ACTOR"].dropna().empty else grp_name
+    nombre_dir = gdf["NOMBRE_DIRECTIVO"].dropna().astype(str).iloc[0] if "NOMBRE_DIRECTIVO" in gdf.columns and not gdf["NOMBRE_DIRECTIVO"].dropna().empty else ""
+    prefijo = gdf["PREFIJO"].dropna().astype(str).iloc[0] if "PREFIJO" in gdf.columns and not gdf["PREFIJO"].dropna().empty else ""
+
+    mapping_text = {"ACTOR": actor, "NOMBRE DIRECTIVO": nombre_dir, "PREFIJO": prefijo, "FECHA_CARTA": fecha_larga}
+    # Derivados
+    mapping_text.update(render_derived_placeholders(mapping_text, derived_cfg))
+
+    # Imágenes por grupo
+    img_map = {}
+    if "FIRMA_IMG" in gdf.columns:
+        fname = str(gdf["FIRMA_IMG"].dropna().astype(str).iloc[0]) if not gdf["FIRMA_IMG"].dropna().empty else None
+        if fname and image_assets and fname in image_assets:
+            img_map["IMG_FIRMA"] = image_assets[fname]
+    if "LOGO_IMG" in gdf.columns:
+        fname = str(gdf["LOGO_IMG"].dropna().astype(str).iloc[0]) if not gdf["LOGO_IMG"].dropna().empty else None
+        if fname and image_assets and fname in image_assets:
+            img_map["IMG_LOGO"] = image_assets[fname]
+
+    # Construcción
+    from io import BytesIO
+    doc = Document(BytesIO(tpl_bytes))
+    table = find_target_table(doc, prefer_index=table_idx)
+    if table is None: raise RuntimeError("No se encontró una tabla válida (4 columnas) en la plantilla.")
+    clear_table_keep_header(table); fill_table(table, filas)
+    _replace_text_and_images(doc, mapping_text, img_map, image_width_in=image_width_in)
+
+    # Footer auto
+    footer_text = (routing_cfg or {}).get("footer_text", "")
+    footer_logo_name = (routing_cfg or {}).get("footer_logo_name", None)
+    footer_logo_bytes = image_assets.get(footer_logo_name) if (image_assets and footer_logo_name) else None
+    if footer_text or footer_logo_bytes:
+        _add_footer_with_pagenum(doc, footer_text=footer_text, logo_bytes=footer_logo_bytes, image_width_in=1.0)
+
+    safe_grp = slugify(grp_name)
+    # Naming pattern por regla > global
+    rule_namepat = rule.get("naming_pattern") if rule else None
+    namepat = rule_namepat or naming_pattern
+    fname = namepat.replace("{GRUPO}", safe_grp).replace("{ACTOR}", safe_grp)
+    return fname, doc, rule, len(filas)
+
 def generate_letters_per_group(
     work_df: pd.DataFrame,
     default_template_bytes: bytes,
@@ -102,69 +173,32 @@ def generate_letters_per_group(
     naming_pattern: str = "CARTA_{GRUPO}.docx",
     image_assets: Dict[str, bytes] = None,
     image_width_in: float = 1.5,
-) -> Tuple[Dict[str, bytes], Dict[str, str], pd.DataFrame]:
+    return_rules: bool = False,
+) -> Tuple[Dict[str, bytes], Dict[str, str], pd.DataFrame] | Tuple[Dict[str, bytes], Dict[str, str], pd.DataFrame, Dict[str, Dict]]:
+    """
+    Devuelve (outputs, errors, index_df). Con return_rules=True agrega un cuarto elemento,
+    rules, que asocia cada archivo con la regla YAML que lo generó.
+    """
     outputs: Dict[str, bytes] = {}; errors: Dict[str, str] = {}; summary_rows: List[List[str]] = []
-    work_df = work_df.sort_values("_FECHA_TS", ascending=not newest_first, na_position="last")
-    d = letter_date or pd.Timestamp.today().date()
-    fecha_larga = f"{city}, {d.day} de {month_name_es(d.month)} de {d.year}"
-
-    derived_cfg = (routing_cfg or {}).get("derived_placeholders", {})
+    rules: Dict[str, Dict] = {}
+    work_df = work_df.sort_values("_FECHA_TS", ascending=not newest_first, na_position="last", kind="stable")
+    fecha_larga = _fecha_larga(city, letter_date)
 
     for grp, gdf in work_df.groupby(group_field, dropna=False):
         grp_name = "(Sin grupo)" if pd.isna(grp) else str(grp)
-        filas = _rows_from_group(gdf)
         try:
-            # Regla y plantilla
-            tpl_bytes, table_idx, rule = choose_template_for_group(grp_name, templates_map, routing_cfg)
-            tpl_bytes = tpl_bytes or default_template_bytes
-            table_idx = table_idx if table_idx is not None else table_index_default
-
-            # Placeholders base
-            actor = gdf["ACTOR"].dropna().astype(str).iloc[0] if "ACTOR" in gdf.columns and not gdf["ACTOR"].dropna().empty else grp_name
-            nombre_dir = gdf["NOMBRE_DIRECTIVO"].dropna().astype(str).iloc[0] if "NOMBRE_DIRECTIVO" in gdf.columns and not gdf["NOMBRE_DIRECTIVO"].dropna().empty else ""
-            prefijo = gdf["PREFIJO"].dropna().astype(str).iloc[0] if "PREFIJO" in gdf.columns and not gdf["PREFIJO"].dropna().empty else ""
-
-            mapping_text = {"ACTOR": actor, "NOMBRE DIRECTIVO": nombre_dir, "PREFIJO": prefijo, "FECHA_CARTA": fecha_larga}
-            # Derivados
-            mapping_text.update(render_derived_placeholders(mapping_text, derived_cfg))
-
-            # Imágenes por grupo
-            img_map = {}
-            if "FIRMA_IMG" in gdf.columns:
-                fname = str(gdf["FIRMA_IMG"].dropna().astype(str).iloc[0]) if not gdf["FIRMA_IMG"].dropna().empty else None
-                if fname and image_assets and fname in image_assets:
-                    img_map["IMG_FIRMA"] = image_assets[fname]
-            if "LOGO_IMG" in gdf.columns:
-                fname = str(gdf["LOGO_IMG"].dropna().astype(str).iloc[0]) if not gdf["LOGO_IMG"].dropna().empty else None
-                if fname and image_assets and fname in image_assets:
-                    img_map["IMG_LOGO"] = image_assets[fname]
-
-            # Construcción
-            from io import BytesIO
-            doc = Document(BytesIO(tpl_bytes))
-            table = find_target_table(doc, prefer_index=table_idx)
-            if table is None: raise RuntimeError("No se encontró una tabla válida (4 columnas) en la plantilla.")
-            clear_table_keep_header(table); fill_table(table, filas)
-            _replace_text_and_images(doc, mapping_text, img_map, image_width_in=image_width_in)
-
-            # Footer auto
-            footer_text = (routing_cfg or {}).get("footer_text", "")
-            footer_logo_name = (routing_cfg or {}).get("footer_logo_name", None)
-            footer_logo_bytes = image_assets.get(footer_logo_name) if (image_assets and footer_logo_name) else None
-            if footer_text or footer_logo_bytes:
-                _add_footer_with_pagenum(doc, footer_text=footer_text, logo_bytes=footer_logo_bytes, image_width_in=1.0)
-
-            out = BytesIO(); doc.save(out); data = out.getvalue()
-            safe_grp = slugify(grp_name)
-            # Naming pattern por regla > global
-            rule_namepat = rule.get("naming_pattern") if rule else None
-            namepat = rule_namepat or naming_pattern
-            fname = namepat.replace("{GRUPO}", safe_grp).replace("{ACTOR}", safe_grp)
-            outputs[fname] = data; summary_rows.append([grp_name, len(filas)])
+            fname, doc, rule, n = _build_group_letter(
+                grp_name, gdf, default_template_bytes, templates_map, routing_cfg,
+                table_index_default, fecha_larga, naming_pattern, image_assets, image_width_in
+            )
+            out = io.BytesIO(); doc.save(out); data = out.getvalue()
+            outputs[fname] = data; rules[fname] = rule or {}; summary_rows.append([grp_name, n])
         except Exception as e:
             errors[grp_name] = str(e)
 
     index_df = pd.DataFrame(summary_rows, columns=["Grupo","Registros"]).sort_values("Grupo").reset_index(drop=True)
+    if return_rules:
+        return outputs, errors, index_df, rules
     return outputs, errors, index_df
 
 def build_index_sheet(index_df: pd.DataFrame, errors: Dict[str, str]) -> bytes:
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+from typing import Any, Dict, List, Optional, Tuple
+
+from .pdf_utils import try_docx_to_pdf, merge_pdfs, add_text_watermark, sign_pdf_with_pfx
+
+def steps_for_rule(rule: Dict[str, Any], defaults: Dict[str, Any] | None = None) -> Dict[str, Any]:
+    """
+    Pasos de post-proceso para una regla: export_pdf, watermark_text, sign_pdf, merge_pdf.
+    Lo que la regla no define se toma de `defaults` (switches globales de la UI).
+    """
+    defaults = defaults or {}
+    rule = rule or {}
+    steps = {
+        "export_pdf": bool(defaults.get("export_pdf")),
+        "watermark_text": defaults.get("watermark_text") or None,
+        "sign_pdf": bool(defaults.get("sign_pdf")),
+        "merge_pdf": bool(defaults.get("merge_pdf")),
+    }
+    for key in steps:
+        if key in rule: steps[key] = rule[key]
+    if not steps["export_pdf"]:
+        # Sin PDF no hay marca de agua, firma ni consolidado
+        steps.update({"watermark_text": None, "sign_pdf": False, "merge_pdf": False})
+    return steps
+
+def _finish_pdf(pdf_bytes: bytes, steps: Dict[str, Any], pfx_bytes: bytes | None, pfx_password: str | None) -> Tuple[Optional[bytes], Optional[str]]:
+    """Marca de agua y firma (pypdf/reportlab/pyhanko); seguro en procesos paralelos. Devuelve (pdf, error)."""
+    pdf_b = pdf_bytes
+    if steps.get("watermark_text"):
+        pdf_b = add_text_watermark(pdf_b, str(steps["watermark_text"]))
+        if not pdf_b: return None, "No se pudo aplicar la marca de agua (requiere reportlab y pypdf)."
+    if steps.get("sign_pdf"):
+        if not (pfx_bytes and pfx_password): return None, "La regla pide firma pero no se cargó PFX/contraseña."
+        pdf_b = sign_pdf_with_pfx(pdf_b, pfx_bytes, pfx_password)
+        if not pdf_b: return None, "No se pudo firmar el PDF (requiere pyhanko y un PFX válido)."
+    return pdf_b, None
+
+def run_postprocess_pipeline(
+    outputs: Dict[str, bytes],
+    rules: Dict[str, Dict[str, Any]],
+    defaults: Dict[str, Any] | None = None,
+    pfx_bytes: bytes | None = None,
+    pfx_password: str | None = None,
+    max_workers: int | None = None,
+) -> Tuple[Dict[str, bytes], Optional[bytes], Dict[str, str]]:
+    """
+    Ejecuta por archivo solo los pasos de su regla (PDF → marca de agua → firma → consolidado).
+    La conversión a PDF es secuencial: docx2pdf controla una única instancia de Word y la cierra
+    al terminar cada archivo. Marca de agua y firma sí corren en procesos paralelos.
+    Devuelve (pdfs, pdf_consolidado, errors); errors asocia cada archivo fallido con su motivo.
+    """
+    errors: Dict[str, str] = {}
+    converted: List[Tuple[str, bytes, Dict[str, Any]]] = []
+    for name, docx_b in outputs.items():
+        steps = steps_for_rule(rules.get(name, {}), defaults)
+        if not steps["export_pdf"]: continue
+        pdf_b = try_docx_to_pdf(docx_b)
+        if not pdf_b:
+            errors[name] = "No se pudo convertir a PDF (requiere docx2pdf y MS Word)."
+            continue
+        converted.append((name, pdf_b, steps))
+    if not converted: return {}, None, errors
+
+    pending = [i for i, (_, _, st) in enumerate(converted) if st["watermark_text"] or st["sign_pdf"]]
+    results: Dict[int, Tuple[Optional[bytes], Optional[str]]] = {}
+    if max_workers == 1 or len(pending) <= 1:
+        for i in pending:
+            _, pdf_b, st = converted[i]
+            try: results[i] = _finish_pdf(pdf_b, st, pfx_bytes, pfx_password)
+            except Exception as e: results[i] = (None, str(e))
+    else:
+        from .prewarm import get_worker_pool
+        with get_worker_pool(max_workers=max_workers) as ex:
+            futures = {i: ex.submit(_finish_pdf, converted[i][1], converted[i][2], pfx_bytes, pfx_password) for i in pending}
+            for i, f in futures.items():
+                try: results[i] = f.result()
+                except Exception as e: results[i] = (None, str(e))
+
+    pdfs: Dict[str, bytes] = {}
+    to_merge: List[bytes] = []
+    for i, (name, pdf_b, steps) in enumerate(converted):
+        if i in results:
+            pdf_b, err = results[i]
+            if err or not pdf_b:
+                errors[name] = err or "Error desconocido en el post-proceso del PDF."
+                continue
+        pdf_name = name.rsplit(".docx", 1)[0] + ".pdf"
+        pdfs[pdf_name] = pdf_b
+        if steps["merge_pdf"]: to_merge.append(pdf_b)
+    merged = merge_pdfs(to_merge) if to_merge else None
+    return pdfs, merged, errors
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+import hashlib, html, threading
+from collections import OrderedDict
+from datetime import date
+from typing import Dict, Optional, Tuple
+import pandas as pd
+from docx import Document
+from docx.oxml.ns import qn
+from docx.table import Table
+from docx.text.paragraph import Paragraph
+
+from .funcionalidades import _build_group_letter, _fecha_larga
+from .routing import choose_template_for_group
+
+_PREVIEW_CACHE: "OrderedDict[Tuple[str, str], str]" = OrderedDict()
+_PREVIEW_CACHE_MAX = 64
+# Compartido entre sesiones de Streamlit (un hilo por sesión)
+_PREVIEW_LOCK = threading.Lock()
+
+def clear_preview_cache() -> None:
+    with _PREVIEW_LOCK:
+        _PREVIEW_CACHE.clear()
+
+def _sha1(data: bytes) -> str:
+    return hashlib.sha1(data).hexdigest()
+
+def _group_hash(gdf: pd.DataFrame, extra: Tuple) -> str:
+    """Hash de las filas del grupo más los parámetros que alteran los placeholders."""
+    h = hashlib.sha1()
+    h.update(",".join(map(str, gdf.columns)).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(gdf.astype(str), index=False).values.tobytes())
+    h.update(repr(extra).encode("utf-8"))
+    return h.hexdigest()
+
+def _paragraph_html(p: Paragraph) -> str:
+    parts = []
+    for run in p.runs:
+        txt = html.escape(run.text)
+        if not txt: continue
+        if run.bold: txt = f"<b>{txt}</b>"
+        if run.italic: txt = f"<i>{txt}</i>"
+        if run.underline: txt = f"<u>{txt}</u>"
+        parts.append(txt)
+    if p._p.findall(".//" + qn("w:drawing")):
+        parts.append("<span style='color:#888'>[imagen]</span>")
+    return f"<p>{''.join(parts) or '&nbsp;'}</p>"
+
+def _table_html(t: Table) -> str:
+    rows = []
+    for i, row in enumerate(t.rows):
+        tag = "th" if i == 0 else "td"
+        cells = "".join(f"<{tag}>{html.escape(c.text)}</{tag}>" for c in row.cells)
+        rows.append(f"<tr>{cells}</tr>")
+    return "<table border='1' cellspacing='0' cellpadding='4' style='border-collapse:collapse;width:100%'>" + "".join(rows) + "</table>"
+
+def docx_to_html(doc: Document) -> str:
+    """Renderizado HTML simple (párrafos, tablas y pie de página) para previsualizar en la UI."""
+    body = []
+    for child in doc.element.body.iterchildren():
+        if child.tag == qn("w:p"): body.append(_paragraph_html(Paragraph(child, doc)))
+        elif child.tag == qn("w:tbl"): body.append(_table_html(Table(child, doc)))
+    footer = []
+    if doc.sections:
+        footer = [_paragraph_html(p) for p in doc.sections[0].footer.paragraphs if p.text.strip()]
+    out = "<div style='font-family:Calibri,Arial,sans-serif;font-size:11pt'>" + "".join(body)
+    if footer:
+        out += "<hr/><div style='font-size:9pt;color:#555'>" + "".join(footer) + "</div>"
+    return out + "</div>"
+
+def render_letter_preview_html(
+    work_df: pd.DataFrame,
+    group_value,
+    default_template_bytes: bytes,
+    templates_map: Dict[str, bytes],
+    routing_cfg: Dict,
+    group_field: str = "ACTOR",
+    table_index_default: int | None = None,
+    newest_first: bool = True,
+    city: str = "Medellín",
+    letter_date: Optional[date] = None,
+    naming_pattern: str = "CARTA_{GRUPO}.docx",
+    image_assets: Dict[str, bytes] = None,
+    image_width_in: float = 1.5,
+) -> str:
+    """
+    Vista previa HTML de la carta de un solo grupo, con la misma lógica que generate_letters_per_group.
+    Cachea por (hash de plantilla, hash de grupo); solo se construye el grupo seleccionado.
+    """
+    if pd.isna(group_value):
+        gdf = work_df[work_df[group_field].isna()]
+        grp_name = "(Sin grupo)"
+    else:
+        gdf = work_df[work_df[group_field].astype(str) == str(group_value)]
+        grp_name = str(group_value)
+    if gdf.empty:
+        return f"<p>No hay registros para <b>{html.escape(grp_name)}</b>.</p>"
+    gdf = gdf.sort_values("_FECHA_TS", ascending=not newest_first, na_position="last", kind="stable")
+
+    template_choice = choose_template_for_group(grp_name, templates_map, routing_cfg)
+    tpl_hash = _sha1(template_choice[0] or default_template_bytes)
+    fecha_larga = _fecha_larga(city, letter_date)
+    cfg = routing_cfg or {}
+    extra = (
+        grp_name, fecha_larga, table_index_default, image_width_in,
+        sorted((cfg.get("derived_placeholders") or {}).items()),
+        cfg.get("footer_text", ""), cfg.get("footer_logo_name"),
+        sorted((k, _sha1(v)) for k, v in (image_assets or {}).items()),
+        repr(cfg.get("templates", [])),
+    )
+    key = (tpl_hash, _group_hash(gdf, extra))
+    with _PREVIEW_LOCK:
+        cached = _PREVIEW_CACHE.get(key)
+        if cached is not None:
+            _PREVIEW_CACHE.move_to_end(key)
+            return cached
+
+    try:
+        _, doc, _, _ = _build_group_letter(
+            grp_name, gdf, default_template_bytes, templates_map, routing_cfg,
+            table_index_default, fecha_larga, naming_pattern, image_assets, image_width_in,
+            template_choice=template_choice
+        )
+        out = docx_to_html(doc)
+    except Exception as e:
+        return f"<p style='color:#b00'>Error al construir la vista previa: {html.escape(str(e))}</p>"
+
+    with _PREVIEW_LOCK:
+        _PREVIEW_CACHE[key] = out
+        _PREVIEW_CACHE.move_to_end(key)
+        while len(_PREVIEW_CACHE) > _PREVIEW_CACHE_MAX:
+            _PREVIEW_CACHE.popitem(last=False)
+    return out
@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+from __future__ import annotations
+import importlib, multiprocessing, os, subprocess, sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# Punto de entrada de los workers (_finish_pdf)
+WORKER_MODULES = ["core.pipeline", "core.pdf_utils"]
+# Dependencias pesadas que pdf_utils importa dentro de sus funciones; opcionales (pueden no estar instaladas)
+OPTIONAL_WORKER_MODULES = ["pypdf", "reportlab.pdfgen.canvas", "reportlab.lib.pagesizes", "pyhanko.sign.signers"]
+
+# Equivalente a lo que importaba el antiguo core/__init__ de forma ansiosa
+EAGER_IMPORT = ("import core.backend, core.routing, core.funcionalidades, core.pdf_utils, "
+                "core.pipeline, core.merge, core.preview, core.quality")
+
+def prewarm(modules: Sequence[str] = WORKER_MODULES, optional: Sequence[str] = OPTIONAL_WORKER_MODULES) -> None:
+    """Importa `modules` (los errores se propagan) y los `optional` que estén instalados."""
+    for mod in modules:
+        importlib.import_module(mod)
+    for mod in optional:
+        try: importlib.import_module(mod)
+        except ImportError: pass
+
+def get_worker_pool(max_workers: int | None = None, preload: bool = True) -> ProcessPoolExecutor:
+    """
+    Pool de procesos para marca de agua/firma. Con `preload`, usa forkserver con WORKER_MODULES y
+    OPTIONAL_WORKER_MODULES ya importados (cada worker nace con pypdf/reportlab/pyhanko cargados);
+    sin forkserver (Windows) ejecuta `prewarm` como initializer de cada worker.
+    Con preload=False devuelve un pool sin precalentar (referencia para el benchmark).
+    """
+    if not preload:
+        return ProcessPoolExecutor(max_workers=max_workers)
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        ctx = multiprocessing.get_context("forkserver")
+        ctx.set_forkserver_preload(WORKER_MODULES + OPTIONAL_WORKER_MODULES)
+        return ProcessPoolExecutor(max_workers=max_workers, mp_context=ctx)
+    return ProcessPoolExecutor(max_workers=max_workers, initializer=prewarm)
+
+def _first_task() -> None:
+    # Lo que carga un worker en su primera marca de agua/firma
+    prewarm()
+
+def time_to_first_task(preload: bool, pools: int = 2) -> List[float]:
+    """Segundos hasta completar la primera tarea en `pools` pools sucesivos de un worker (el primero incluye arrancar el forkserver)."""
+    import time
+    out = []
+    for _ in range(pools):
+        t = time.perf_counter()
+        with get_worker_pool(max_workers=1, preload=preload) as ex:
+            ex.submit(_first_task).result()
+        out.append(time.perf_counter() - t)
+    return out
+
+def worker_startup_benchmark(repeat: int = 3) -> Dict[str, Tuple[Optional[List[float]], str]]:
+    """
+    Tiempo hasta la primera tarea de un worker, pool precalentado vs. pool simple, cada medición en un
+    intérprete nuevo. Devuelve {modo: (mejores tiempos por pool, error)}.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    out: Dict[str, Tuple[Optional[List[float]], str]] = {}
+    for label, preload in (("pool simple", False), ("pool precalentado", True)):
+        code = ("if __name__ == '__main__':\n"
+                f"    from core.prewarm import time_to_first_task; print(time_to_first_task({preload}))")
+        runs: List[List[float]] = []
+        error = ""
+        for _ in range(repeat):
+            res = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=root)
+            if res.returncode != 0:
+                error = res.stderr.strip().splitlines()[-1] if res.stderr.strip() else f"exit {res.returncode}"
+                break
+            runs.append([float(x) for x in res.stdout.strip().splitlines()[-1].strip("[]").split(",")])
+        out[label] = (None, error) if error else ([min(col) for col in zip(*runs)], "")
+    return out
+
+def import_time_benchmark(statements: Optional[List[str]] = None, repeat: int = 3) -> Dict[str, Tuple[Optional[float], str]]:
+    """
+    Mide el arranque en frío (segundos, mejor de `repeat`) de un intérprete nuevo para cada sentencia.
+    Devuelve {sentencia: (segundos, error)}; si la sentencia falla, segundos es None y error trae el stderr.
+    """
+    statements = statements or [
+        EAGER_IMPORT,
+        "import core",
+        "import core.pipeline",
+        "import core.prewarm as p; p.prewarm()",
+    ]
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = "import time, sys; t=time.perf_counter(); exec(sys.argv[1]); print(time.perf_counter()-t)"
+    out: Dict[str, Tuple[Optional[float], str]] = {}
+    for stmt in statements:
+        times: List[float] = []
+        error = ""
+        for _ in range(repeat):
+            res = subprocess.run([sys.executable, "-c", code, stmt], capture_output=True, text=True, cwd=root)
+            if res.returncode != 0:
+                error = res.stderr.strip().splitlines()[-1] if res.stderr.strip() else f"exit {res.returncode}"
+                break
+            times.append(float(res.stdout.strip().splitlines()[-1]))
+        out[stmt] = (None, error) if error else (min(times), "")
+    return out
+
+if __name__ == "__main__":
+    for stmt, (secs, error) in import_time_benchmark().items():
+        if secs is None: print(f"{'ERROR':>12}  {stmt}\n              {error}")
+        else: print(f"{secs*1000:9.1f} ms  {stmt}")
+    print("Primera tarea de un worker (pool 1 / pool 2):")
+    for label, (secs, error) in worker_startup_benchmark().items():
+        if secs is None: print(f"{'ERROR':>12}  {label}\n              {error}")
+        else: print("  ".join(f"{x*1000:9.1f} ms" for x in secs) + f"  {label}")
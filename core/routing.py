@@ -1,6 +1,7 @@
 
 # -*- coding: utf-8 -*-
 from __future__ import annotations
+from functools import lru_cache
 from typing import Dict, Any, Optional
 import re, yaml
 from jinja2 import Template
@@ -19,7 +20,7 @@ def load_routing_yaml(text: str | None) -> Dict[str, Any]:
 def choose_template_for_group(group_name: str, templates_map: Dict[str, bytes], routing_cfg: Dict[str, Any]) -> tuple[Optional[bytes], Optional[int], Dict[str, Any]]:
     """
     Devuelve (template_bytes, table_index, rule_obj) según reglas.
-    Regla puede incluir: template, table_index, export_pdf, naming_pattern, watermark_text, sign_pdf
+    Regla puede incluir: template, table_index, export_pdf, naming_pattern, watermark_text, sign_pdf, merge_pdf
     """
     if not routing_cfg or "templates" not in routing_cfg: return (None, None, {})
     for rule in routing_cfg["templates"]:
@@ -40,6 +41,11 @@ def choose_template_for_group(group_name: str, templates_map: Dict[str, bytes],
             return (tpl_bytes, idx, rule)
     return (None, None, {})
 
+@lru_cache(maxsize=256)
+def compile_placeholder_template(expr: str) -> Template:
+    """Compila (una sola vez por expresión) la plantilla Jinja2 de un placeholder derivado."""
+    return Template(expr)
+
 def render_derived_placeholders(mapping: Dict[str,str], derived_cfg: Dict[str,str]) -> Dict[str,str]:
     """
     derived_cfg ejemplo:
@@ -49,7 +55,7 @@ def render_derived_placeholders(mapping: Dict[str,str], derived_cfg: Dict[str,st
     out = {}
     for k, expr in (derived_cfg or {}).items():
         try:
-            tmpl = Template(str(expr))
+            tmpl = compile_placeholder_template(str(expr))
             out[k] = tmpl.render(**mapping)
         except Exception:
             out[k] = ""
@@ -4,6 +4,7 @@ from __future__ import annotations
 import io
 import pandas as pd
 import streamlit as st
+import streamlit.components.v1 as components
 from docx import Document
 from datetime import date
 
@@ -11,7 +12,8 @@ from core.backend import guess_mapping, prepare_dataframe
 from core.routing import load_routing_yaml
 from core.funcionalidades import generate_letters_per_group, build_index_sheet, make_zip
 from core.merge import merge_documents_docx
-from core.pdf_utils import try_docx_to_pdf, merge_pdfs, add_text_watermark, sign_pdf_with_pfx
+from core.preview import render_letter_preview_html
+from core.pipeline import run_postprocess_pipeline
 from core.quality import compute_missing_summary, compute_duplicates_by_actor, compute_date_ranges_by_actor
 
 def run_app() -> None:
@@ -40,6 +42,8 @@ def run_app() -> None:
                                  "    export_pdf: true\n"
                                  "    naming_pattern: 'HAC_{GRUPO}.docx'\n"
                                  "    watermark_text: 'CONFIDENCIAL'\n"
+                                 "    sign_pdf: false\n"
+                                 "    merge_pdf: true\n"
                                  "  - match_regex: '^Secretaría de Gobierno$'\n"
                                  "    template: 'MODELO_A.docx'\n"
                                  "    table_index: 0\n"
@@ -128,23 +132,33 @@ def run_app() -> None:
     default_template_bytes = list(templates_map.values())[0]
     image_assets = {f.name: f.read() for f in img_files} if img_files else {}
 
+    # Mismos parámetros para la vista previa y la generación
+    gen_kwargs = dict(
+        default_template_bytes=default_template_bytes,
+        templates_map=templates_map,
+        routing_cfg=routing_cfg,
+        group_field="ACTOR",
+        table_index_default=None,
+        newest_first=newest_first,
+        city=city,
+        letter_date=letter_date,
+        naming_pattern="CARTA_{GRUPO}.docx",
+        image_assets=image_assets,
+        image_width_in=image_width_in
+    )
+
+    # ====== Vista previa de una carta ======
+    st.subheader("Vista previa de carta")
+    preview_actors = sorted([a for a in work["ACTOR"].dropna().astype(str).unique() if a.strip()])
+    preview_actor = st.selectbox("ACTOR a previsualizar", [None]+preview_actors)
+    if preview_actor:
+        preview_html = render_letter_preview_html(work_df=work, group_value=preview_actor, **gen_kwargs)
+        components.html(preview_html, height=600, scrolling=True)
+
     # ====== Generación ======
     st.subheader("Generación")
     if st.button("Generar"):
-        outputs, errors, index_df = generate_letters_per_group(
-            work_df=work,
-            default_template_bytes=default_template_bytes,
-            templates_map=templates_map,
-            routing_cfg=routing_cfg,
-            group_field="ACTOR",
-            table_index_default=None,
-            newest_first=newest_first,
-            city=city,
-            letter_date=letter_date,
-            naming_pattern="CARTA_{GRUPO}.docx",
-            image_assets=image_assets,
-            image_width_in=image_width_in
-        )
+        outputs, errors, index_df, rules = generate_letters_per_group(work_df=work, return_rules=True, **gen_kwargs)
         st.success(f"Cartas generadas (DOCX): {len(outputs)}")
         st.dataframe(index_df, use_container_width=True)
         if errors:
@@ -164,36 +178,25 @@ def run_app() -> None:
                 st.download_button("Descargar DOCX consolidado", data=merged, file_name="cartas_consolidado.docx",
                     mime="application/vnd.openxmlformats-officedocument.wordprocessingml.document")
 
-        # Reglas de exportación por YAML y switches globales
-        pdfs = []
-        if gen_pdf or any(r.get("export_pdf") for r in routing_cfg.get("templates", [])):
-            for name, docx_b in outputs.items():
-                # ¿Regla específica?
-                base = name.replace(".docx","")
-                # Buscar regla por coincidencia de base en nombre del grupo es complejo; aquí generamos PDF siempre si gen_pdf=True o si routing dice export_pdf:true
-                pdf_b = try_docx_to_pdf(docx_b)
-                if not pdf_b: 
-                    continue
-                wm = next((r.get("watermark_text") for r in routing_cfg.get("templates", []) if r.get("export_pdf")), None)
-                if add_wm or wm:
-                    pdf_b = add_text_watermark(pdf_b, wm or "BORRADOR") or pdf_b
-                # Firma digital si se subió PFX
-                if pfx_file and pfx_pass:
-                    try:
-                        pfx_bytes = pfx_file.read()
-                        signed = sign_pdf_with_pfx(pdf_b, pfx_bytes, pfx_pass)
-                        if signed: pdf_b = signed
-                    except Exception:
-                        pass
-                pdf_name = base + ".pdf"
-                pdfs.append((pdf_name, pdf_b))
-                st.download_button(f"Descargar {pdf_name}", data=pdf_b, file_name=pdf_name, mime="application/pdf")
+        # Post-proceso por regla YAML (los switches globales aplican cuando la regla no define el paso)
+        defaults = {
+            "export_pdf": gen_pdf,
+            "watermark_text": wm_text if add_wm else None,
+            "sign_pdf": bool(pfx_file and pfx_pass),
+            "merge_pdf": merge_pdf,
+        }
+        pfx_bytes = pfx_file.read() if (pfx_file and pfx_pass) else None
+        pdfs, merged_pdf, pdf_errors = run_postprocess_pipeline(outputs, rules, defaults=defaults,
+                                                                pfx_bytes=pfx_bytes, pfx_password=pfx_pass)
+        if pdf_errors:
+            st.warning("Errores en PDF:")
+            for f, e in pdf_errors.items(): st.write(f"- **{f}**: {e}")
+        for pdf_name, pdf_b in pdfs.items():
+            st.download_button(f"Descargar {pdf_name}", data=pdf_b, file_name=pdf_name, mime="application/pdf")
 
         # Consolidado PDF
-        if merge_pdf and pdfs:
-            merged_pdf = merge_pdfs([b for _, b in pdfs])
-            if merged_pdf:
-                st.download_button("Descargar PDF consolidado", data=merged_pdf, file_name="cartas_consolidado.pdf", mime="application/pdf")
+        if merged_pdf:
+            st.download_button("Descargar PDF consolidado", data=merged_pdf, file_name="cartas_consolidado.pdf", mime="application/pdf")
 
         # ZIP + Índice
         st.download_button("Descargar todas las cartas (ZIP DOCX)", data=make_zip(outputs),